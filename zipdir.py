@@ -22,12 +22,22 @@ You can extend ignoring with --exclude globs or a .zipignore file (one glob per
 from __future__ import annotations
 
 import argparse
+import bisect
+import errno
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import functools
 import os
 from pathlib import Path
-import posixpath
+import re
+import shutil
 import sys
+import time
 import zipfile
-from typing import Iterable, List, Set
+import zlib
+from typing import BinaryIO, Callable, Deque, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Set, Tuple, Union
+
+StrPath = Union[str, "os.PathLike[str]"]
 
 # Use real .gitignore semantics
 try:
@@ -41,6 +51,13 @@ except ImportError:
     )
     raise SystemExit(3)
 
+# Optional SIMD-accelerated DEFLATE (python-isal). It only has levels 0-3, so
+# it is used for levels 1-3 and CPython's zlib for everything else.
+try:
+    from isal import isal_zlib
+except ImportError:
+    isal_zlib = None
+
 # --- Defaults ---
 
 DEFAULT_EXCLUDED_DIR_NAMES: Set[str] = {
@@ -81,18 +98,27 @@ DEFAULT_EXCLUDED_GLOBS: Set[str] = {
     "._*",
 }
 
-def load_ignore_file(path: Path) -> List[str]:
+# Default "hidden everything" pattern. should_exclude checks it with a plain
+# startswith rather than as part of a regex union.
+_HIDDEN_PATTERN = ".*"
+
+def load_ignore_file(path: StrPath) -> List[str]:
     """Read ignore patterns from a file (one glob per line, '#' for comments)."""
-    patterns: List[str] = []
+    path = os.fspath(path)
     try:
-        for raw in path.read_text(encoding="utf-8").splitlines():
-            line = raw.strip()
-            if not line or line.startswith("#"):
-                continue
-            patterns.append(line)
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    return list(_load_ignore_file_cached(path, mtime_ns))
+
+@functools.lru_cache(maxsize=8)
+def _load_ignore_file_cached(path: str, mtime_ns: int) -> Tuple[str, ...]:
+    """Parse path; keyed on mtime_ns so an edited file is read again."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return tuple(line for line in (raw.strip() for raw in f) if line and not line.startswith("#"))
     except FileNotFoundError:
-        pass
-    return patterns
+        return ()
 
 def _collect_negation_prefixes(patterns: Iterable[str]) -> Set[str]:
     """
@@ -134,16 +160,102 @@ def _collect_negation_prefixes(patterns: Iterable[str]) -> Set[str]:
     return prefixes
 
 
-def build_ignore_spec(excludes: Iterable[str]) -> tuple[PathSpec, Set[str]]:
+class IgnoreSpec(NamedTuple):
+    """Compiled ignore rules, as returned by build_ignore_spec."""
+    spec: PathSpec
+    neg_prefixes: Tuple[str, ...]  # sorted, for bisection
+    # Fast-path tiers from _build_fast_matcher (only used when fast is True)
+    fast: bool
+    hidden: bool
+    names: FrozenSet[str]
+    dir_names: FrozenSet[str]
+    name_re: Optional[Pattern[str]]
+    path_re: Optional[Pattern[str]]
+
+
+# pathspec marks directory matches with a named group; names must be unique
+# within a single regex, so they are turned into plain groups for the union.
+_NAMED_GROUP_RE = re.compile(r"\(\?P<\w+>")
+
+
+# Patterns that are just a name (optionally 'name/'): matched with a set lookup
+_SIMPLE_NAME_RE = re.compile(r"[^/*?\[\\]+/?")
+
+FastMatcher = Tuple[bool, FrozenSet[str], FrozenSet[str], Optional[Pattern[str]], Optional[Pattern[str]]]
+
+
+def _build_fast_matcher(spec: PathSpec) -> Optional[FastMatcher]:
     """
-    Build a PathSpec with .gitignore semantics from defaults + user patterns.
-    Returns (spec, negation_prefixes).
+    Split the patterns of spec into tiers that are cheaper than
+    spec.match_file, which loops over every pattern per path:
+
+    - bare names ('Thumbs.db', 'node_modules/') go into sets of names that
+      match anything / only directories, checked with a hash lookup;
+    - the hidden pattern ('.*') is tested directly by should_exclude;
+    - other globs without a '/' ('*.pyc') match a name at any depth, so they
+      are folded into one regex run against just the entry name;
+    - the rest ('*/coverage/*', 'build*/') go into a regex run against the
+      relative path.
+
+    Returns (hidden, names, dir_names, name_re, path_re), with None for an
+    empty regex tier, or None when spec contains a '!' negation (then the
+    last matching pattern decides, which these tiers cannot express);
+    callers must use spec.match_file instead.
+    """
+    names: Set[str] = set()
+    dir_names: Set[str] = set()
+    name_parts: List[str] = []
+    path_parts: List[str] = []
+    hidden = False
+    for pat in spec.patterns:
+        if pat.include is None:
+            continue  # blank line / comment
+        if not pat.include:
+            return None
+        line = pat.pattern
+        if line == _HIDDEN_PATTERN:
+            hidden = True
+        elif line == line.strip() and _SIMPLE_NAME_RE.fullmatch(line):
+            if line.endswith("/"):
+                dir_names.add(line[:-1])
+            else:
+                names.add(line)
+        else:
+            # Directory-only globs need the trailing '/' of a directory path
+            parts = path_parts if "/" in line else name_parts
+            parts.append("(?:" + _NAMED_GROUP_RE.sub("(?:", pat.regex.pattern) + ")")
+    name_re = re.compile("|".join(name_parts)) if name_parts else None
+    path_re = re.compile("|".join(path_parts)) if path_parts else None
+    return hidden, frozenset(names), frozenset(dir_names), name_re, path_re
+
+
+def should_exclude(rel_posix: str, name: str, is_dir: bool, rules: IgnoreSpec) -> bool:
     """
+    True if rel_posix (a file path, or a directory path ending in '/') whose
+    last segment is name should be ignored.
+
+    Like the walker, this assumes the parent directories were already checked
+    (and not pruned): bare-name patterns are only compared against name.
+    """
+    if not rules.fast:
+        return rules.spec.match_file(rel_posix)
+    if name in rules.names or (is_dir and name in rules.dir_names):
+        return True
+    # Same as the '.*' pattern, given that hidden parents were pruned
+    if rules.hidden and name.startswith("."):
+        return True
+    if rules.name_re is not None and rules.name_re.match(name) is not None:
+        return True
+    return rules.path_re is not None and rules.path_re.match(rel_posix) is not None
+
+
+def _default_lines() -> List[str]:
+    """Default ignore patterns, as .gitignore-style lines."""
     lines: List[str] = []
 
     # Default "hidden everything" like your original behavior (can be overridden via !)
     # In .gitignore semantics, patterns without '/' match in any directory.
-    lines.append(".*")
+    lines.append(_HIDDEN_PATTERN)
 
     # Convert default directory names into dir patterns (match anywhere)
     for d in DEFAULT_EXCLUDED_DIR_NAMES:
@@ -156,92 +268,434 @@ def build_ignore_spec(excludes: Iterable[str]) -> tuple[PathSpec, Set[str]]:
 
     # Existing glob-style defaults (already POSIX). These work under gitwild too.
     lines.extend(DEFAULT_EXCLUDED_GLOBS)
+    return lines
 
-    # User/CLI/.zipignore additions (support '/', '**', and '!' negations)
-    lines.extend(excludes)
 
+def _compile_ignore_spec(lines: List[str]) -> IgnoreSpec:
+    """Compile lines into an IgnoreSpec."""
     spec = PathSpec.from_lines(GitWildMatchPattern, lines)
-    neg_prefixes = _collect_negation_prefixes(lines)
-    return spec, neg_prefixes
+    neg_prefixes = tuple(sorted(_collect_negation_prefixes(lines)))
+    fast = _build_fast_matcher(spec)
+    if fast is None:
+        return IgnoreSpec(spec, neg_prefixes, False, False, frozenset(), frozenset(), None, None)
+    return IgnoreSpec(spec, neg_prefixes, True, *fast)
 
 
-def collect_files(src_dir: Path, excludes: Iterable[str]) -> List[Path]:
+# Compiled once at import; most runs use only the defaults
+_DEFAULT_SPEC: IgnoreSpec = _compile_ignore_spec(_default_lines())
+
+@functools.lru_cache(maxsize=32)
+def _build_ignore_spec_cached(excludes: Tuple[str, ...]) -> IgnoreSpec:
+    # User/CLI/.zipignore additions (support '/', '**', and '!' negations)
+    return _compile_ignore_spec(_default_lines() + list(excludes))
+
+
+def build_ignore_spec(excludes: Iterable[str]) -> IgnoreSpec:
     """
-    Traverse src_dir and return a list of file Paths to include, honoring
-    .gitignore-style patterns. We prune directories when the spec ignores them
-    AND no negation ('!') pattern could re-include something beneath.
+    Build a PathSpec with .gitignore semantics from defaults + user patterns.
+    Returns an IgnoreSpec. Results are cached per tuple of excludes.
     """
-    src_dir = src_dir.resolve()
-    include_files: List[Path] = []
-
-    spec, neg_prefixes = build_ignore_spec(excludes)
+    excludes = tuple(excludes)
+    if not excludes:
+        return _DEFAULT_SPEC
+    return _build_ignore_spec_cached(excludes)
 
-    for root, dirs, files in os.walk(src_dir, topdown=True, followlinks=False):
-        root_path = Path(root)
-        rel_root = root_path.relative_to(src_dir).as_posix() if root_path != src_dir else ""
 
-        # Prune directories (but keep if a later '!' could re-include children)
-        for d in list(dirs):
-            d_rel = (posixpath.join(rel_root, d) if rel_root else d) + "/"
-            if spec.match_file(d_rel):
-                # If any negation prefix lies inside d_rel, don't prune
-                if not any(neg.startswith(d_rel) for neg in neg_prefixes):
-                    dirs.remove(d)
+def _walk(src_dir: str, prune_dir: Callable[[str, str], bool]) -> Iterator[Tuple[str, os.DirEntry]]:
+    """
+    Depth-first walk of src_dir over os.scandir, in the same order as a
+    top-down os.walk. Yields (rel_posix, entry) for every file; the DirEntry
+    caches its stat() result, so callers never need a separate stat by path.
+
+    Relative paths are built by string concatenation from a per-directory
+    'rel/' prefix instead of Path.relative_to. Each subdirectory is offered
+    to prune_dir as ('rel/', name) and not entered when it returns True. Symlinked
+    directories are never entered (like os.walk(followlinks=False)).
+    """
+    stack: List[Tuple[str, str]] = [("", src_dir)]
+    while stack:
+        rel_prefix, dir_path = stack.pop()
+        try:
+            it = os.scandir(dir_path)
+        except OSError:
+            continue  # unreadable directory; os.walk skips these silently too
+
+        subdirs: List[Tuple[str, str, str]] = []
+        with it:
+            for entry in it:
+                name = entry.name
+                rel = rel_prefix + name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():
+                        subdirs.append((rel + "/", name, entry.path))
+                else:
+                    yield rel, entry
+
+        # Prune in one pass, then reverse so the first subdirectory is walked first
+        stack.extend(reversed([(d_rel, path) for d_rel, name, path in subdirs if not prune_dir(d_rel, name)]))
+
+
+def _iter_included(src_dir: str, excludes: Iterable[str]) -> Iterator[Tuple[os.DirEntry, str]]:
+    """
+    Walk src_dir and yield (entry, arcname) for the files to include,
+    honoring .gitignore-style patterns. We prune directories when the spec
+    ignores them AND no negation ('!') pattern could re-include something
+    beneath.
+    """
+    rules = build_ignore_spec(excludes)
+    neg_prefixes = rules.neg_prefixes
+
+    if neg_prefixes:
+        def prune_dir(d_rel: str, name: str) -> bool:
+            # Keep the directory if any negation prefix lies inside d_rel. In
+            # sorted order, prefixes starting with d_rel directly follow it.
+            if should_exclude(d_rel, name, True, rules):
+                i = bisect.bisect_left(neg_prefixes, d_rel)
+                return not (i < len(neg_prefixes) and neg_prefixes[i].startswith(d_rel))
+            return False
+    else:
+        def prune_dir(d_rel: str, name: str) -> bool:
+            return should_exclude(d_rel, name, True, rules)
+
+    for f_rel, entry in _walk(src_dir, prune_dir):
+        if not should_exclude(f_rel, entry.name, False, rules):
+            yield entry, f_rel
+
+
+def iter_included_files(src_dir: StrPath, excludes: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Traverse src_dir lazily and yield (full_path, arcname) string pairs for
+    the files to include, honoring .gitignore-style patterns (see
+    _iter_included). Memory stays flat regardless of the tree size.
+    """
+    for entry, arcname in _iter_included(os.path.abspath(src_dir), excludes):
+        yield entry.path, arcname
 
-        # Files
-        for f in files:
-            f_rel = posixpath.join(rel_root, f) if rel_root else f
-            if spec.match_file(f_rel):
-                continue
-            include_files.append(root_path / f)
 
-    return include_files
+def collect_files(src_dir: StrPath, excludes: Iterable[str]) -> List[Tuple[str, str]]:
+    """List form of iter_included_files."""
+    return list(iter_included_files(src_dir, excludes))
 
-def next_available_path(path: Path) -> Path:
+def next_available_path(path: StrPath) -> Path:
     """
     If `path` exists, return 'stem-1.suffix', 'stem-2.suffix', ... until unused.
     Example: out.zip -> out-1.zip -> out-2.zip ...
+
+    Numbers in use are assumed to be contiguous, so the first free one is
+    found by doubling and then bisecting: O(log n) probes instead of n. With
+    gaps in the numbering, some free number is returned, not always the
+    smallest.
     """
-    path = path.resolve()
-    if not path.exists():
-        return path
+    path = os.path.abspath(path)
+    if not os.path.lexists(path):
+        return Path(path)
+
+    stem, suffix = os.path.splitext(path)
+
+    def taken(i: int) -> bool:
+        return os.path.lexists(f"{stem}-{i}{suffix}")
+
+    hi = 1
+    while taken(hi):
+        hi *= 2
+    lo = hi // 2  # taken, or 0 when hi == 1; hi is free
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if taken(mid):
+            lo = mid
+        else:
+            hi = mid
+    return Path(f"{stem}-{hi}{suffix}")
+
+# Low levels keep most of the size reduction of 6 (zlib's default) at a
+# fraction of the CPU time
+DEFAULT_COMPRESS_LEVEL = 3
+
+# Already-compressed formats: DEFLATE gains nothing on these (and may grow
+# them), so they are stored as-is
+_STORED_EXTS: FrozenSet[str] = frozenset({
+    # Archives / compressed streams
+    ".zip", ".gz", ".tgz", ".xz", ".bz2", ".7z", ".zst", ".br",
+    # Images
+    ".jpg", ".jpeg", ".png", ".webp", ".gif",
+    # Audio / video
+    ".mp4", ".mp3", ".mkv", ".avi", ".ogg", ".opus", ".webm",
+    # Fonts
+    ".woff2",
+})
+
+# Chunk size for copying file contents into the archive (zipfile uses 8 KiB)
+_COPY_BUFSIZE = 1 << 20
+
+# sendfile() into a regular file is Linux-only (macOS/BSD need a socket)
+_USE_SENDFILE = sys.platform.startswith("linux") and hasattr(os, "sendfile")
+
+# sendfile errnos meaning "not supported here": fall back to a plain copy
+_SENDFILE_UNSUPPORTED = frozenset({errno.EINVAL, errno.ENOSYS, errno.ENOTSUP, errno.EOPNOTSUPP})
+
+# Files up to this size are compressed in memory by worker threads
+_PARALLEL_MAX_SIZE = 8 << 20
+
+
+def _zip_info(arcname: str, st: os.stat_result, compress_type: int, compresslevel: Optional[int]) -> zipfile.ZipInfo:
+    """Build the ZipInfo for a regular file from an existing stat result (like ZipInfo.from_file)."""
+    info = zipfile.ZipInfo(arcname, time.localtime(st.st_mtime)[:6])
+    info.external_attr = (st.st_mode & 0xFFFF) << 16
+    info.file_size = st.st_size
+    info.compress_type = compress_type
+    info._compresslevel = compresslevel  # what ZipFile.write sets too
+    return info
+
+
+def _deflate_backend(compresslevel: Optional[int]):
+    """Return the zlib-compatible module to compress with at compresslevel."""
+    if isal_zlib is not None and compresslevel is not None and 1 <= compresslevel <= isal_zlib.ISAL_BEST_COMPRESSION:
+        return isal_zlib
+    return zlib
+
+
+def _deflate_file(fp: str, compresslevel: Optional[int]) -> Tuple[bytes, int, int]:
+    """
+    Read fp and compress it as raw DEFLATE, the form stored in a ZIP entry.
+    Returns (payload, crc32, file_size). Runs in worker threads; zlib and
+    isal release the GIL while compressing.
+    """
+    z = _deflate_backend(compresslevel)
+    level = z.Z_DEFAULT_COMPRESSION if compresslevel is None else compresslevel
+    co = z.compressobj(level, z.DEFLATED, -15)
+    with open(fp, "rb") as f:
+        data = f.read()
+    return co.compress(data) + co.flush(), z.crc32(data), len(data)
 
-    parent = path.parent
-    stem = path.stem
-    suffix = path.suffix
-    i = 1
-    while True:
-        candidate = parent / f"{stem}-{i}{suffix}"
-        if not candidate.exists():
-            return candidate
-        i += 1
 
-def make_zip(src_dir: Path, zip_path: Path, extra_excludes: Iterable[str] = ()) -> int:
+def _crc32_file(f: BinaryIO, size: int) -> int:
     """
-    Create zip_path from src_dir while skipping default and extra_excludes patterns.
-    Returns the number of files added.
+    CRC32 of the first size bytes of the open file f, read in chunks. Raises
+    OSError if f is shorter than size; bytes past size are ignored.
+    """
+    crc32 = isal_zlib.crc32 if isal_zlib is not None else zlib.crc32
+    crc = 0
+    remaining = size
+    while remaining:
+        chunk = f.read(min(_COPY_BUFSIZE, remaining))
+        if not chunk:
+            raise OSError(f"File changed size while being added: {f.name}")
+        crc = crc32(chunk, crc)
+        remaining -= len(chunk)
+    return crc
+
+
+def _begin_entry(zf: zipfile.ZipFile, info: zipfile.ZipInfo, zip64: Optional[bool] = None) -> bool:
     """
-    src_dir = src_dir.resolve()
-    zip_path = zip_path.resolve()
+    Write the local header for an entry whose CRC and sizes are already known.
+    Mirrors what zf.open(info, "w") does, except the header is written once
+    with the final values instead of being patched afterwards. The payload
+    must follow, then _end_entry. Returns whether ZIP64 extra fields were
+    written, which a later rewrite of the header must repeat.
+    """
+    info.flag_bits = 0x00
+    if zip64 is None:
+        zip64 = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
 
-    # If output zip is inside source tree, exclude it explicitly
-    extra = list(extra_excludes)
-    try:
-        zip_rel = zip_path.relative_to(src_dir).as_posix()
-        extra.append(zip_rel)
-    except ValueError:
-        pass  # not inside src
+    zf.fp.seek(zf.start_dir)
+    info.header_offset = zf.fp.tell()
+    zf._writecheck(info)
+    zf._didModify = True
+    zf.fp.write(info.FileHeader(zip64))
+    return zip64
+
+
+def _end_entry(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> None:
+    """Register an entry after its payload was written (as zf.open does on close)."""
+    zf.start_dir = zf.fp.tell()
+    zf.filelist.append(info)
+    zf.NameToInfo[info.filename] = info
+
+
+def _write_raw(zf: zipfile.ZipFile, info: zipfile.ZipInfo, payload: bytes) -> None:
+    """
+    Append an entry whose payload is already in its final (compressed) form.
+    info.CRC and info.file_size must be set.
+    """
+    info.compress_size = len(payload)
+    _begin_entry(zf, info)
+    zf.fp.write(payload)
+    _end_entry(zf, info)
+
+
+def _write_deflated(zf: zipfile.ZipFile, info: zipfile.ZipInfo, fp: str, compresslevel: Optional[int]) -> None:
+    """
+    Append fp DEFLATEd in chunks with the _deflate_backend compressor, so
+    large files get isal too. The CRC and sizes are only known at the end, so
+    the local header is rewritten afterwards, as zf.open(info, "w") does.
+    info.file_size must be set; it decides up front whether ZIP64 is needed.
+    """
+    z = _deflate_backend(compresslevel)
+    level = z.Z_DEFAULT_COMPRESSION if compresslevel is None else compresslevel
+    co = z.compressobj(level, z.DEFLATED, -15)
+    info.CRC = info.compress_size = 0
+    # Same headroom zipfile allows for DEFLATE expanding incompressible data
+    zip64 = _begin_entry(zf, info, info.file_size * 1.05 > zipfile.ZIP64_LIMIT)
+    crc = size = compress_size = 0
+    with open(fp, "rb", buffering=0) as src:
+        while True:
+            chunk = src.read(_COPY_BUFSIZE)
+            if not chunk:
+                break
+            crc = z.crc32(chunk, crc)
+            size += len(chunk)
+            out = co.compress(chunk)
+            compress_size += len(out)
+            zf.fp.write(out)
+    out = co.flush()
+    compress_size += len(out)
+    zf.fp.write(out)
+
+    info.CRC, info.file_size, info.compress_size = crc, size, compress_size
+    end = zf.fp.tell()
+    zf.fp.seek(info.header_offset)
+    zf.fp.write(info.FileHeader(zip64))  # raises LargeZipFile if it outgrew the guess
+    zf.fp.seek(end)
+    _end_entry(zf, info)
+
+
+def _write_stored(zf: zipfile.ZipFile, info: zipfile.ZipInfo, fp: str) -> None:
+    """
+    Append fp uncompressed, copying its bytes in the kernel with os.sendfile
+    rather than through Python buffers. The CRC needs a read pass first
+    since it goes into the local header. info.file_size must be set.
+    """
+    size = info.file_size
+    with open(fp, "rb") as src:
+        info.CRC = _crc32_file(src, size)
+        info.compress_size = size
+
+        _begin_entry(zf, info)
+        zf.fp.flush()
+        start = zf.fp.tell()
+        out_fd = zf.fp.fileno()
+        in_fd = src.fileno()
+        offset = 0
+        try:
+            while offset < size:
+                sent = os.sendfile(out_fd, in_fd, offset, size - offset)
+                if not sent:
+                    raise OSError(f"File changed size while being added: {fp}")
+                offset += sent
+        except OSError as e:
+            # Some filesystems (FUSE, vboxsf, network mounts) reject sendfile;
+            # copy the rest through Python like shutil does
+            if e.errno not in _SENDFILE_UNSUPPORTED:
+                raise
+        # sendfile moved the descriptor's offset behind the buffered writer's back
+        zf.fp.seek(start + offset)
+        if offset < size:
+            src.seek(offset)
+            remaining = size - offset
+            while remaining:
+                chunk = src.read(min(_COPY_BUFSIZE, remaining))
+                if not chunk:
+                    raise OSError(f"File changed size while being added: {fp}")
+                zf.fp.write(chunk)
+                remaining -= len(chunk)
+    _end_entry(zf, info)
+
+
+def _write_files(zf: zipfile.ZipFile, files: Iterable[Tuple[os.DirEntry, str]]) -> int:
+    """
+    Add (entry, arcname) pairs to zf in order and return how many were added.
+    files is consumed lazily.
+
+    Files up to _PARALLEL_MAX_SIZE are DEFLATEd in a thread pool and written
+    in submission order as they finish; at most 2 per worker are in flight to
+    bound memory. Larger files, and files with an extension in _STORED_EXTS
+    (added uncompressed), are written on this thread: DEFLATEd ones with
+    _write_deflated, stored ones with _write_stored on Linux, anything else
+    streamed through zf.open.
+    """
+    default_type = zf.compression
+    compresslevel = zf.compresslevel
+    workers = os.cpu_count() or 1
+    pending: Deque[Tuple[zipfile.ZipInfo, Future]] = deque()
+    count = 0
+
+    def write_next() -> None:
+        info, fut = pending.popleft()
+        payload, info.CRC, info.file_size = fut.result()
+        _write_raw(zf, info, payload)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for entry, arcname in files:
+            count += 1
+            fp = entry.path
+            st = entry.stat()  # follows symlinks like zf.write; cached by the DirEntry
+            if os.path.splitext(arcname)[1].lower() in _STORED_EXTS:
+                compress_type = zipfile.ZIP_STORED
+            else:
+                compress_type = default_type
+            info = _zip_info(arcname, st, compress_type, compresslevel)
+
+            if compress_type == zipfile.ZIP_DEFLATED and st.st_size <= _PARALLEL_MAX_SIZE:
+                pending.append((info, pool.submit(_deflate_file, fp, compresslevel)))
+                if len(pending) >= 2 * workers:
+                    write_next()
+                continue
 
-    files = collect_files(src_dir, extra)
-    files = [p for p in files if p != zip_path]
+            # Entries must stay in order: flush everything queued before this one
+            while pending:
+                write_next()
+            if compress_type == zipfile.ZIP_DEFLATED:
+                _write_deflated(zf, info, fp, compresslevel)
+                continue
+            if compress_type == zipfile.ZIP_STORED and _USE_SENDFILE:
+                _write_stored(zf, info, fp)
+                continue
+            # file_size is known up front, so zipfile switches to ZIP64 on its own
+            with open(fp, "rb", buffering=0) as src, zf.open(info, "w") as dst:
+                shutil.copyfileobj(src, dst, _COPY_BUFSIZE)
 
-    zip_path.parent.mkdir(parents=True, exist_ok=True)
+        while pending:
+            write_next()
+    return count
 
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
-        for fp in files:
-            arcname = fp.relative_to(src_dir).as_posix()
-            zf.write(fp, arcname)
-    return len(files)
+
+def _is_output(entry: os.DirEntry, out_st: os.stat_result) -> bool:
+    """
+    True if entry is the archive being written (or a symlink to it). Compared
+    by file identity, since path strings differ under symlinked or
+    case-insensitive source paths.
+    """
+    return os.path.samestat(entry.stat(), out_st)
+
+
+def make_zip(src_dir: StrPath, zip_path: StrPath, extra_excludes: Iterable[str] = (), level: int = DEFAULT_COMPRESS_LEVEL) -> int:
+    """
+    Create zip_path from src_dir while skipping default and extra_excludes patterns.
+    level is the DEFLATE level (1-9); 0 stores files uncompressed.
+    Returns the number of files added.
+    """
+    # Plain abspath: no filesystem access for paths that are already absolute
+    src_dir = os.path.abspath(src_dir)
+    zip_path = os.path.abspath(zip_path)
+
+    os.makedirs(os.path.dirname(zip_path), exist_ok=True)
+
+    compression = zipfile.ZIP_STORED if level == 0 else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(zip_path, "w", compression=compression, compresslevel=level) as zf:
+        # Streamed straight from the walk; the file list is never materialized.
+        # The archive already exists while the tree is walked, so skip it by
+        # identity rather than adding it as an exclude pattern.
+        out_st = os.fstat(zf.fp.fileno())
+        files = (
+            (entry, arcname)
+            for entry, arcname in _iter_included(src_dir, extra_excludes)
+            if not _is_output(entry, out_st)
+        )
+        return _write_files(zf, files)
 
 def parse_args(argv: List[str]) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Zip a folder while skipping common junk/build/cache files.")
@@ -250,6 +704,7 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
     p.add_argument("--exclude", "-x", action="append", default=[], help="Extra glob pattern to exclude (can be used multiple times)")
     p.add_argument("--zipignore", type=Path, default=None, help="Optional ignore file path (one glob per line). If omitted, '.zipignore' in the source dir is used when present.")
     p.add_argument("--list", action="store_true", help="Dry run: list files that would be included and exit")
+    p.add_argument("--level", type=int, default=DEFAULT_COMPRESS_LEVEL, choices=range(0, 10), metavar="0-9", help=f"Compression level (default: {DEFAULT_COMPRESS_LEVEL}); 0 stores files without compression")
     return p.parse_args(argv)
 
 def main(argv: List[str] | None = None) -> int:
@@ -257,27 +712,33 @@ def main(argv: List[str] | None = None) -> int:
     src: Path = ns.src
     out: Path = ns.out
 
-    if not src.exists() or not src.is_dir():
+    if not src.is_dir():
         print(f"Error: source directory not found: {src}", file=sys.stderr)
         return 2
 
+    # Make paths absolute once; everything below works on these strings
+    src_abs = os.path.abspath(src)
+    out_abs = os.path.abspath(out)
+
     # Load ignore patterns
     extra: List[str] = list(ns.exclude)
-    ignore_file = ns.zipignore if ns.zipignore is not None else (src / ".zipignore")
+    ignore_file = ns.zipignore if ns.zipignore is not None else Path(src_abs, ".zipignore")
     extra.extend(load_ignore_file(ignore_file))
 
     # Choose a non-clobbering output path (appends -1, -2, ...)
-    final_out = next_available_path(out)
+    final_out = next_available_path(out_abs)
 
     if ns.list:
-        files = collect_files(src, extra)
-        print(f"Would create {final_out} with {len(files)} files:\n")
-        for fp in files:
-            print(fp.relative_to(src).as_posix())
+        print(f"Would create {final_out} with:\n")
+        count = 0
+        for _, arcname in iter_included_files(src_abs, extra):
+            print(arcname)
+            count += 1
+        print(f"\n{count} files")
         return 0
 
-    count = make_zip(src, final_out, extra_excludes=extra)
-    if final_out != out:
+    count = make_zip(src_abs, final_out, extra_excludes=extra, level=ns.level)
+    if str(final_out) != out_abs:
         print(f"Note: '{out}' already exists. Using '{final_out.name}'.")
     print(f"Created {final_out} with {count} files from {src}")
     return 0